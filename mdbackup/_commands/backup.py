@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
 from datetime import datetime
 import logging
 import os
@@ -5,7 +7,8 @@ from pathlib import Path
 import re
 import shutil
 import sys
-from typing import Any, Dict, List, Tuple
+from threading import Event
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from ..actions.runner import run_task_actions
 from ..config import Config, SecretConfig
@@ -15,16 +18,38 @@ from ..utils import write_data_file
 
 
 MANIFEST_VERSION = 1
+TASKS_DEFINITIONS_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+_secrets_cache: ContextVar[Optional[Dict[Tuple[int, str], str]]] = ContextVar('secrets_cache', default=None)
 
 
 def _generate_backup_path(backups_folder: Path) -> Path:
     """
     Creates a path with the folder (named with the right structure)
-    that will be used as backup folder in this run.
+    that will be used as backup folder in this run. The ``backups_folder``
+    must be already resolved.
     """
     now = datetime.utcnow()
     isostring = now.isoformat(timespec='minutes')
-    return Path(backups_folder, isostring).resolve()
+    return backups_folder / isostring
+
+
+def _get_previous_backup(current_backup: Path) -> Optional[Path]:
+    """
+    Gets the folder of the previous backup from the ``current`` symlink. If the symlink does not exist, is not a
+    symlink or points to a folder that does not exist, then there is no previous backup.
+    """
+    try:
+        prev_backup = current_backup.parent / os.readlink(current_backup)
+    except OSError:
+        return None
+
+    if not prev_backup.is_dir():
+        logging.getLogger(__name__).getChild('get_previous_backup').warning(
+            f'Previous backup {prev_backup} does not exist, ignoring it',
+        )
+        return None
+    return prev_backup
 
 
 def _get_tasks_definitions(config_path: Path) -> List[Path]:
@@ -34,9 +59,34 @@ def _get_tasks_definitions(config_path: Path) -> List[Path]:
     defs_dir = config_path / 'tasks'
     if not defs_dir.exists():
         raise FileNotFoundError('The tasks folder does not exist')
-    definitions = [x for x in defs_dir.iterdir() if x.is_file() and x.name.split('.')[-1] in ('json', 'yaml', 'yml')]
-    definitions.sort()
-    return [script.absolute() for script in definitions]
+    with os.scandir(defs_dir) as entries:
+        definitions = [entry for entry in entries
+                       if entry.is_file() and entry.name.endswith(TASKS_DEFINITIONS_EXTENSIONS)]
+    definitions.sort(key=lambda entry: entry.name)
+    return [Path(entry.path).absolute() for entry in definitions]
+
+
+def _load_tasks_definitions(tasks_definitions: List[Path]) -> List[Tasks]:
+    """
+    Parses all tasks definitions files concurrently, keeping the same order as in the given list.
+    """
+    logger = logging.getLogger(__name__).getChild('load_tasks_definitions')
+    if len(tasks_definitions) == 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(8, len(tasks_definitions))) as executor:
+        futures = [(tasks_definition, executor.submit(Tasks, tasks_definition))
+                   for tasks_definition in tasks_definitions]
+        all_tasks = []
+        for tasks_definition, future in futures:
+            try:
+                logger.debug(f'Loading tasks definition file {tasks_definition}')
+                all_tasks.append(future.result())
+            except KeyError:
+                logger.error(f'Could not parse {tasks_definition}')
+                raise
+
+    return all_tasks
 
 
 def _inject_resolved_env_into_actions(
@@ -48,26 +98,24 @@ def _inject_resolved_env_into_actions(
     Given a list of actions for a task, resolves all secrets, injects them in the parameters to pass to each action
     and returns the new parameters for the actions.
     """
-    resolved_env = _resolve_secrets(env, secrets)
+    # Without secret backends there is nothing to resolve, only the env vars
+    has_secrets = len(secrets) > 0
+    resolved_env = _resolve_secrets(env, secrets) if has_secrets else env
     resolved_env = _resolve_env_vars(resolved_env, resolved_env)
-    new_actions = []
-    for it in actions:
-        key, value = next(iter(it.items()))
-        resolved_value = _resolve_secrets(value, secrets)
+    new_actions = [None] * len(actions)
+    for i, it in enumerate(actions):
+        (key, value), = it.items()
         if isinstance(value, dict):
             new_value = {
                 **resolved_env,
-                **resolved_value,
+                **(_resolve_secrets(value, secrets) if has_secrets else value),
             }
-            new_value = _resolve_secrets(new_value, secrets)
-            new_value = _resolve_env_vars(new_value, resolved_env)
-            new_actions.append({key: new_value})
+            new_actions[i] = {key: _resolve_env_vars(new_value, resolved_env)}
         elif isinstance(value, str):
-            new_value = _resolve_secrets({'v': value}, secrets)['v']
-            new_value = _resolve_env_vars(new_value, resolved_env)
-            new_actions.append({key: new_value})
+            new_value = _resolve_secrets({'v': value}, secrets)['v'] if has_secrets else value
+            new_actions[i] = {key: _resolve_env_vars(new_value, resolved_env)}
         else:
-            new_actions.append({key: value})
+            new_actions[i] = {key: value}
 
     return new_actions
 
@@ -96,14 +144,17 @@ def _run_tasks(
         if not str(final_backup_path).startswith(str(backup_path)):
             raise ValueError('inside is not valid: cannot go outside the backup path, use relative paths')
         prev_backup_path = prev_backup_path / tasks.inside_folder if prev_backup_path is not None else None
-        final_backup_path.mkdir(exist_ok=True, parents=True)
+        if not final_backup_path.is_dir():
+            os.makedirs(final_backup_path, exist_ok=True)
         final_backup_path.chmod(0o755)
 
+    final_backup_str = os.fspath(final_backup_path)
+    prev_backup_str = os.fspath(prev_backup_path) if prev_backup_path is not None else None
     tasks_results: Dict[str, Path] = {}
     for task in tasks.tasks:
         run_hook('backup:tasks:task:pre', {
-            'path': str(final_backup_path),
-            'previousPath': str(prev_backup_path) if prev_backup_path is not None else None,
+            'path': final_backup_str,
+            'previousPath': prev_backup_str,
             'tasksName': tasks.name,
             'taskName': task.name,
         })
@@ -121,8 +172,8 @@ def _run_tasks(
             tasks_results[task.name] = run_task_actions(task.name, actions).relative_to(backup_path)
 
             run_hook('backup:tasks:task:post', {
-                'path': str(final_backup_path),
-                'previousPath': str(prev_backup_path) if prev_backup_path is not None else None,
+                'path': final_backup_str,
+                'previousPath': prev_backup_str,
                 'tasksName': tasks.name,
                 'taskName': task.name,
                 'result': str(tasks_results[task.name]),
@@ -131,8 +182,8 @@ def _run_tasks(
             logger.exception(f'Task {task.name} failed')
             run_hook('backup:tasks:task:error', {
                 'message': ', '.join(e.args),
-                'path': str(final_backup_path),
-                'previousPath': str(prev_backup_path) if prev_backup_path is not None else None,
+                'path': final_backup_str,
+                'previousPath': prev_backup_str,
                 'tasksName': tasks.name,
                 'taskName': task.name,
             })
@@ -144,7 +195,7 @@ def _run_tasks(
     return tasks_results
 
 
-def _resolve_secret(key_parts: List[str], secret: SecretConfig):
+def _resolve_secret(key_parts: Tuple[str, ...], secret: SecretConfig):
     """
     Given a key in parts and a secret configuration, tries to resolve the secret
     from the backend using the configured alias in the ``env`` section of the
@@ -155,47 +206,87 @@ def _resolve_secret(key_parts: List[str], secret: SecretConfig):
         return
 
     value = secret.env
-    while len(key_parts) > 0:
-        key_part = key_parts.pop(0)
-        if isinstance(value, dict) and key_part in value:
-            value = value[key_part]
-        else:
+    for key_part in key_parts:
+        if not isinstance(value, dict):
+            return
+        value = value.get(key_part)
+        if value is None:
             return
 
-    return secret.backend.get_secret(value)
+    return _get_secret(secret, value)
+
+
+def _get_secret(secret: SecretConfig, key: str):
+    """
+    Gets the secret from the backend. If there is a backup running, the secret is cached so the same secret
+    is requested only once to the backend during the backup.
+    """
+    cache = _secrets_cache.get()
+    if cache is None:
+        return secret.backend.get_secret(key)
+
+    cache_key = (id(secret.backend), key)
+    if cache_key not in cache:
+        cache[cache_key] = secret.backend.get_secret(key)
+    return cache[cache_key]
+
+
+def _dicts_needing_resolution(env: dict) -> Set[int]:
+    """
+    Returns the ids of ``env`` and the dicts nested inside it that contain a secret alias, directly or in any of
+    their nested dicts. Every dict is visited once, the nested dicts are checked before the dict containing them.
+    """
+    needing_resolution = set()
+    pending = [(env, False)]
+    while len(pending) > 0:
+        value, children_checked = pending.pop()
+        if children_checked:
+            if any((isinstance(v, str) and v.startswith('#')) or (isinstance(v, dict) and id(v) in needing_resolution)
+                   for v in value.values()):
+                needing_resolution.add(id(value))
+        else:
+            pending.append((value, True))
+            pending.extend((v, False) for v in value.values() if isinstance(v, dict))
+    return needing_resolution
 
 
 def _resolve_secrets(env: dict, secrets: List[SecretConfig]) -> dict:
     """
     Given a environment dict, tries to resolve all secrets found and returns a
-    copy of the dict with secrets resolved.
+    copy of the dict with secrets resolved. Nested dicts without secrets are
+    not copied, so they must not be modified.
     """
     logger = logging.getLogger(__name__).getChild('resolve_secrets')
     if not isinstance(env, dict):
         return env
+    needing_resolution = _dicts_needing_resolution(env)
+    if id(env) not in needing_resolution:
+        return env.copy()
 
     new_env = {}
-    for key, value in env.items():
-        if isinstance(value, str):
-            if value.startswith('#'):
+    pending = [(env, new_env)]
+    while len(pending) > 0:
+        current_env, current_new_env = pending.pop()
+        for key, value in current_env.items():
+            if isinstance(value, str) and value.startswith('#'):
                 logger.debug(f'Trying to resolve env {key} with secret alias {value}')
                 new_value = None
+                key_parts = tuple(value[1:].split('.'))
                 for secret in secrets:
-                    new_value = _resolve_secret(value[1:].split('.'), secret)
+                    new_value = _resolve_secret(key_parts, secret)
                     if new_value is not None:
                         logger.debug(f'Env {key} resolved using {secret.type}')
-                        new_env[key] = new_value
+                        current_new_env[key] = new_value
                         break
 
                 if new_value is None:
                     logger.warning(f'Env {key} with secret alias {value} cannot be resolved')
-                    new_env[key] = value
+                    current_new_env[key] = value
+            elif isinstance(value, dict) and id(value) in needing_resolution:
+                current_new_env[key] = {}
+                pending.append((value, current_new_env[key]))
             else:
-                new_env[key] = value
-        elif isinstance(value, dict):
-            new_env[key] = _resolve_secrets(value, secrets)
-        else:
-            new_env[key] = value
+                current_new_env[key] = value
 
     return new_env
 
@@ -233,9 +324,142 @@ def _resolve_env_vars(value, task_env: dict) -> dict:
     elif isinstance(value, list):
         return list(map(lambda x: _resolve_env_vars(x, task_env), value))
     else:
+        # The dict can be shared with the tasks definition, so the resolved values are stored in a copy
+        new_value = dict(value)
+        if task_env is value:
+            task_env = new_value
         for key, val in value.items():
-            value[key] = _resolve_env_vars(val, task_env)
-        return value
+            new_value[key] = _resolve_env_vars(val, task_env)
+        return new_value
+
+
+def _run_tasks_definition(
+    tasks: Tasks,
+    backup_path: Path,
+    prev_backup_path: Path,
+    env: dict,
+    secrets: List[SecretConfig],
+) -> Dict[str, Path]:
+    """
+    Runs the tasks of a tasks definition file, calling the ``backup:tasks`` hooks. If any of the tasks fails,
+    it will raise an exception.
+    """
+    logger = logging.getLogger(__name__).getChild('run_tasks_definition')
+    logger.info(f'Preparing to run tasks of {tasks.name}')
+    run_hook('backup:tasks:pre', {'path': str(backup_path), 'tasksName': tasks.name})
+    try:
+        # env is already resolved, only the tasks definition env needs to be resolved
+        resolved_tasks_env = {**env, **_resolve_secrets(tasks.env, secrets)}
+        result = _run_tasks(tasks, backup_path, prev_backup_path, resolved_tasks_env, secrets)
+    except Exception as e:
+        logger.error(f'One of the tasks of {tasks.name} failed')
+        run_hook('backup:tasks:error', {
+            'path': str(backup_path),
+            'message': ', '.join(e.args),
+            'tasksName': tasks.name,
+        })
+        raise Exception(f'One of the tasks of {tasks.name} failed, backup will stop', tasks.name)
+
+    run_hook('backup:tasks:post', {
+        'path': str(backup_path),
+        'tasksName': tasks.name,
+        'created': [str(p) for p in result.values()],
+    })
+    return result
+
+
+def _inside_folders_overlap(first: Tuple[str, ...], second: Tuple[str, ...]) -> bool:
+    """
+    Checks if one of the inside folders (as path parts) is the same or contains the other one. The backup root,
+    without parts, overlaps with every folder.
+    """
+    return first[:len(second)] == second or second[:len(first)] == first
+
+
+def _group_tasks_definitions(all_tasks: List[Tasks], parallelism: int) -> List[List[Tasks]]:
+    """
+    Groups the tasks definitions that must run one after the other. When running in parallel, the definitions
+    whose ``inside`` folders overlap (one is the same or is inside the other) are put in the same group, so they
+    never run at the same time. Definitions without ``inside`` write in the backup root, so they overlap with all
+    of them. Without parallelism, all of them are in the same group to keep the order.
+    """
+    if parallelism <= 1:
+        return [all_tasks] if len(all_tasks) > 0 else []
+
+    groups: List[List[Tuple[int, Tuple[str, ...], Tasks]]] = []
+    for i, tasks in enumerate(all_tasks):
+        inside_folder = Path(os.path.normpath(tasks.inside_folder) if tasks.inside_folder is not None else '.').parts
+        overlapping = [group for group in groups
+                       if any(_inside_folders_overlap(inside_folder, other) for _, other, _ in group)]
+        merged_group = [item for group in overlapping for item in group] + [(i, inside_folder, tasks)]
+        merged_group.sort(key=lambda item: item[0])
+        groups = [group for group in groups if all(group is not other for other in overlapping)] + [merged_group]
+
+    groups.sort(key=lambda group: group[0][0])
+    return [[tasks for _, _, tasks in group] for group in groups]
+
+
+def _run_tasks_definitions_group(
+    group: List[Tasks],
+    backup_path: Path,
+    prev_backup_path: Path,
+    env: dict,
+    secrets: List[SecretConfig],
+    failed: Event,
+) -> Dict[str, Dict[str, Path]]:
+    """
+    Runs the tasks definitions of the group one after the other. If any of the tasks definitions fails in this
+    or in other groups, the next definitions are not run.
+    """
+    results = {}
+    for tasks in group:
+        if failed.is_set():
+            break
+        try:
+            results[tasks.file_name] = _run_tasks_definition(tasks, backup_path, prev_backup_path, env, secrets)
+        except Exception:
+            failed.set()
+            raise
+    return results
+
+
+def _run_all_tasks_definitions(
+    all_tasks: List[Tasks],
+    backup_path: Path,
+    prev_backup_path: Path,
+    env: dict,
+    secrets: List[SecretConfig],
+    parallelism: int,
+) -> Dict[str, Dict[str, Path]]:
+    """
+    Runs all tasks definitions, up to ``parallelism`` of them at the same time, and returns the results of each
+    of them by their file name. Without parallelism, they run in the current thread. If any of them fails, or the
+    run is interrupted, the pending definitions are not started and the exception is raised.
+    """
+    failed = Event()
+    groups = _group_tasks_definitions(all_tasks, parallelism)
+    if parallelism <= 1:
+        results: Dict[str, Dict[str, Path]] = {}
+        for group in groups:
+            results.update(_run_tasks_definitions_group(group, backup_path, prev_backup_path, env, secrets, failed))
+        return results
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = [executor.submit(copy_context().run, _run_tasks_definitions_group,
+                                   group, backup_path, prev_backup_path, env, secrets, failed)
+                   for group in groups]
+        try:
+            for future in futures:
+                results.update(future.result())
+        except BaseException:
+            # Stop the other groups as soon as possible, the running definitions will end before leaving
+            failed.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+    return results
 
 
 def _create_backup_manifest(backup_path: Path, results: Dict[str, Tuple[Tasks, Dict[str, Path]]]):
@@ -271,7 +495,8 @@ def _create_backup_manifest(backup_path: Path, results: Dict[str, Tuple[Tasks, D
 def _do_backup(backups_folder: Path,
                config_path: Path,
                env: dict = {},
-               secrets: List[SecretConfig] = []) -> Path:
+               secrets: List[SecretConfig] = [],
+               parallelism: int = 1) -> Path:
     """
     Looks for the tasks defs, prepares the directory where the backups will
     be stored, run the tasks and saves the directory with the right name.
@@ -279,12 +504,26 @@ def _do_backup(backups_folder: Path,
     store the backups in ``backups_folder``. The ``env`` are environment
     variables that will be defined in the tasks execution. Finally, the
     ``secrets`` parameter declares a list of secret backends from where
-    secrets will be extracted when requested from ``env`` sections.
+    secrets will be extracted when requested from ``env`` sections. Up to
+    ``parallelism`` tasks definitions are run at the same time.
     """
+    cache_token = _secrets_cache.set({})
+    try:
+        return _do_backup_impl(backups_folder, config_path, env, secrets, parallelism)
+    finally:
+        _secrets_cache.reset(cache_token)
+
+
+def _do_backup_impl(backups_folder: Path,
+                    config_path: Path,
+                    env: dict,
+                    secrets: List[SecretConfig],
+                    parallelism: int) -> Path:
     logger = logging.getLogger(__name__).getChild('do_backup')
-    tmp_backup = Path(backups_folder, '.partial')
-    prev_backup = backups_folder / 'current'
-    prev_backup = prev_backup.resolve() if prev_backup.exists() else None
+    backups_folder = backups_folder.resolve()
+    tmp_backup = backups_folder / '.partial'
+    current_backup = backups_folder / 'current'
+    prev_backup = _get_previous_backup(current_backup)
     resolved_env = _resolve_secrets(env, secrets)
 
     run_hook('backup:pre', {'path': str(tmp_backup)})
@@ -292,35 +531,12 @@ def _do_backup(backups_folder: Path,
     logger.info(f'Temporary backup folder is {tmp_backup}')
     tmp_backup.mkdir(exist_ok=True, parents=True)
     tmp_backup.chmod(0o755)
-    tasks_definitions_results: Dict[str, Tuple[Tasks, Dict[str, Path]]] = {}
-    for tasks_definition in _get_tasks_definitions(config_path):
-        try:
-            logger.debug(f'Loading tasks definition file {tasks_definition}')
-            tasks = Tasks(tasks_definition)
-        except KeyError:
-            logger.error(f'Could not parse {tasks_definition}')
-            raise
-
-        logger.info(f'Preparing to run tasks of {tasks.name}')
-        run_hook('backup:tasks:pre', {'path': str(tmp_backup), 'tasksName': tasks.name})
-        try:
-            resolved_tasks_env = _resolve_secrets({**resolved_env, **tasks.env}, secrets)
-            result = _run_tasks(tasks, tmp_backup, prev_backup, resolved_tasks_env, secrets)
-            tasks_definitions_results[tasks.file_name] = (tasks, result)
-        except Exception as e:
-            logger.error(f'One of the tasks of {tasks.name} failed')
-            run_hook('backup:tasks:error', {
-                'path': str(tmp_backup),
-                'message': ', '.join(e.args),
-                'tasksName': tasks.name,
-            })
-            raise Exception(f'One of the tasks of {tasks.name} failed, backup will stop', tasks.name)
-
-        run_hook('backup:tasks:post', {
-            'path': str(tmp_backup),
-            'tasksName': tasks.name,
-            'created': [str(p) for p in tasks_definitions_results[tasks.file_name][1].values()],
-        })
+    all_tasks = _load_tasks_definitions(_get_tasks_definitions(config_path))
+    results = _run_all_tasks_definitions(all_tasks, tmp_backup, prev_backup, resolved_env, secrets, parallelism)
+    tasks_definitions_results: Dict[str, Tuple[Tasks, Dict[str, Path]]] = {
+        tasks.file_name: (tasks, results[tasks.file_name])
+        for tasks in all_tasks
+    }
 
     backup = _generate_backup_path(backups_folder)
     logger.info(f'Moving {tmp_backup} to {backup}')
@@ -329,7 +545,6 @@ def _do_backup(backups_folder: Path,
     logger.info(f'Creating manifest of backup {backup}')
     _create_backup_manifest(backup, tasks_definitions_results)
 
-    current_backup = Path(backups_folder, 'current')
     if current_backup.is_symlink():
         current_backup.unlink()
     os.symlink(backup, current_backup)
@@ -352,7 +567,8 @@ def main_backup(config: Config) -> Path:
                           env={
                              **config.env,
                           },
-                          secrets=config.secrets)
+                          secrets=config.secrets,
+                          parallelism=config.parallelism)
     except Exception as e:
         logger.error(e)
         run_hook('backup:error', {
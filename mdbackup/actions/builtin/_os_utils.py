@@ -1,7 +1,9 @@
+import io
 import logging
 import os
 from pathlib import Path
 from threading import Thread
+from typing import Optional
 
 try:
     import xattr
@@ -72,9 +74,35 @@ def _read_xattrs(path: Path) -> dict:
             for xattr_key in _listxattr(path, symlink=True)}
 
 
+class _PipeStream(io.FileIO):
+    """
+    Read end of a pipe that is filled by a thread. When it is closed, waits for the thread to end. If the thread
+    failed, the exception is stored in ``error``.
+    """
+    thread: Optional[Thread] = None
+    error: Optional[BaseException] = None
+
+    def close(self):
+        super().close()
+        if self.thread is not None:
+            self.thread.join()
+
+
 def _manual_pipe_boilerplate(action, args=(), name='undefined'):
     read_fd, write_fd = os.pipe()
     write_stream = os.fdopen(write_fd, 'wb', buffering=0, closefd=True)
-    p = Thread(target=action, args=(write_stream, *args), name=f'mdbackup-{name}', daemon=True)
-    p.start()
-    return os.fdopen(read_fd, 'rb', buffering=0, closefd=True)
+    read_stream = _PipeStream(read_fd, 'rb', closefd=True)
+
+    def action_impl():
+        try:
+            action(write_stream, *args)
+        except BaseException as e:
+            logging.getLogger(__name__).getChild(name).exception(f'{name} failed writing into the pipe')
+            read_stream.error = e
+        finally:
+            # Closing the write end always lets the reader know that there is no more data
+            write_stream.close()
+
+    read_stream.thread = Thread(target=action_impl, name=f'mdbackup-{name}', daemon=True)
+    read_stream.thread.start()
+    return read_stream
@@ -1,5 +1,9 @@
+import gzip
+import io
+import shutil
 import subprocess
 
+from mdbackup.actions.builtin._os_utils import _manual_pipe_boilerplate
 from mdbackup.actions.builtin.command import action_command
 from mdbackup.actions.container import action, unaction
 from mdbackup.actions.ds import InputDataStream
@@ -34,15 +38,20 @@ def action_decompress_xz(inp: InputDataStream, params) -> subprocess.Popen:
     return action_command(inp, {'args': args})
 
 
-@action('compress-gz', input='stream', output='stream:process')
-def action_compress_gzip(inp: InputDataStream, params) -> subprocess.Popen:
+@action('compress-gz', input='stream', output='stream:pipe')
+def action_compress_gzip(inp: InputDataStream, params) -> io.FileIO:
     compression_level = params.get('compressionLevel')
+    # The level can be a string if it comes from an env var
+    compression_level = int(compression_level) if compression_level is not None else 6
 
-    args = ['gzip', '-c']
-    if compression_level is not None:
-        args.append(f'-{compression_level}')
+    def action_compress_gzip_impl(out):
+        try:
+            with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compression_level) as gz:
+                shutil.copyfileobj(inp, gz, 1024 * 1024)
+        finally:
+            out.close()
 
-    return action_command(inp, {'args': args})
+    return _manual_pipe_boilerplate(action_compress_gzip_impl, name='compress-gz')
 
 
 @unaction('compress-gz')
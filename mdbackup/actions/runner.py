@@ -5,6 +5,7 @@ import subprocess
 import types
 from typing import Any, Dict, List, Optional, Tuple
 
+from mdbackup.actions.builtin._os_utils import _PipeStream
 from mdbackup.actions.container import are_compatible, get_action, get_unaction, is_final
 from mdbackup.actions.ds import OutputDataStream
 
@@ -96,6 +97,8 @@ def _cleanup(things_to_dipose: List[Tuple[OutputDataStream, str]], has_raised: b
                 failed.append((action, lines))
         else:
             thing.close()
+            if isinstance(thing, _PipeStream) and thing.error is not None:
+                failed.append((action, repr(thing.error)))
 
     if len(failed) > 0:
         raise RuntimeError('\n\n'.join((f'{action}:\n{lines}' for action, lines in failed)), failed)
@@ -63,6 +63,7 @@ class Config(object):
         self.__actions_modules = conf.get('actionsModules', [])
         self.__log_level = logging.getLevelName(conf.get('logLevel', 'WARNING'))
         self.__max_backups_kept = conf.get('maxBackupsKept', 7)
+        self.__parallelism = conf.get('parallelism', 1)
         self.__env = conf.get('env', {})
         self.__secrets = [
             SecretConfig(key, secret_dict.get('envDefs'), secret_dict['config'], secret_dict.get('storageProviders'))
@@ -113,6 +114,13 @@ class Config(object):
         """
         return self.__max_backups_kept
 
+    @property
+    def parallelism(self) -> int:
+        """
+        :return: The maximum number of tasks definitions that can run at the same time
+        """
+        return self.__parallelism
+
     @property
     def env(self) -> Dict[str, str]:
         """
@@ -24,12 +24,7 @@ class FileSecretsBackend(AbstractSecretsBackend):
         path = Path(key)
         if not path.is_absolute():
             path = self._base_path / path
-        with open(path, 'r') as secret_file:
-            lines = secret_file.readlines()
-            contents = [line.replace('\r\n', '').replace('\n', '') for line in lines]
-            while len(contents[-1]) == 0:
-                contents.pop()
-        return '\n'.join(contents)
+        return path.read_text().rstrip('\n')
 
     def get_provider(self, key: str) -> Dict[str, any]:
         contents = self.get_secret(key)
@@ -34,9 +34,10 @@ class B2Storage(AbstractStorage):
 
     def list_directory(self, path: Union[str, Path, str]) -> List[str]:
         full_path = self.__ok_key(path)
-        return [key[len(self.__pre):].lstrip('/')
-                for key in [file_name[len(self.__pre):].lstrip('/')
-                            for (_, file_name) in self.__bucket.list_file_names(full_path)]
+        # ls() filters by prefix in the server and returns the sub-folders as a single entry
+        return [key
+                for key in [(folder_name or file_version.file_name)[len(self.__pre):].lstrip('/')
+                            for (file_version, folder_name) in self.__bucket.ls(full_path)]
                 if key != '']
 
     def create_folder(self, name: str, parent: Union[Path, str] = None) -> str:
@@ -59,7 +60,7 @@ class B2Storage(AbstractStorage):
         file_to_upload = str(path.absolute())
         ret = self.__bucket.upload_local_file(local_file=file_to_upload,
                                               file_name=key,
-                                              content_type=magic.from_file(str(path.absolute()), mime=True),
+                                              content_type=magic.from_file(file_to_upload, mime=True),
                                               )
         self.__log.debug(ret)
 
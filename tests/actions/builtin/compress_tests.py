@@ -0,0 +1,46 @@
+import io
+import subprocess
+from unittest.mock import Mock
+
+from tests.classes import TestCaseWithoutLogs
+
+from mdbackup.actions.builtin.compress import action_compress_gzip
+from mdbackup.actions.runner import _cleanup
+
+
+class ActionCompressGzipTests(TestCaseWithoutLogs):
+    _data = b'some data to compress\n' * 10000
+
+    def _decompress(self, compressed: bytes) -> bytes:
+        return subprocess.run(['gzip', '-d'], input=compressed, stdout=subprocess.PIPE, check=True).stdout
+
+    def test_compressed_stream_should_be_decompressed_by_gzip(self):
+        out = action_compress_gzip(io.BytesIO(self._data), {})
+
+        compressed = out.read()
+        _cleanup([(out, 'compress-gz')], False)
+
+        self.assertLess(len(compressed), len(self._data))
+        self.assertEqual(self._data, self._decompress(compressed))
+
+    def test_compression_level_as_string_should_work(self):
+        out = action_compress_gzip(io.BytesIO(self._data), {'compressionLevel': '9'})
+
+        compressed = out.read()
+        _cleanup([(out, 'compress-gz')], False)
+
+        self.assertEqual(self._data, self._decompress(compressed))
+
+    def test_invalid_compression_level_should_raise(self):
+        with self.assertRaises(ValueError):
+            action_compress_gzip(io.BytesIO(self._data), {'compressionLevel': 'max'})
+
+    def test_failure_while_compressing_should_make_cleanup_raise(self):
+        inp = Mock()
+        inp.read = Mock(side_effect=OSError('cannot read'))
+
+        out = action_compress_gzip(inp, {})
+        out.read()
+
+        with self.assertRaisesRegex(RuntimeError, 'compress-gz:.+cannot read'):
+            _cleanup([(out, 'compress-gz')], False)
@@ -3,6 +3,7 @@ from unittest.mock import Mock
 
 from tests.classes import TestCaseWithoutLogs
 
+from mdbackup.actions.builtin._os_utils import _manual_pipe_boilerplate
 from mdbackup.actions.runner import _cleanup
 
 
@@ -55,6 +56,25 @@ class CleanupTests(TestCaseWithoutLogs):
         with self.assertRaisesRegex(RuntimeError, '.+this didn\'t work :\\(.+'):
             _cleanup(things, False)
 
+    def test_cleanup_a_pipe_whose_thread_failed_should_raise_exception(self):
+        def fail(out):
+            out.write(b'partial')
+            raise ValueError('it did not work')
+
+        pipe = _manual_pipe_boilerplate(fail, name='test')
+        pipe.read()
+        things = [(pipe, 'test')]
+
+        with self.assertRaisesRegex(RuntimeError, 'test:.+it did not work'):
+            _cleanup(things, False)
+
+    def test_cleanup_a_pipe_whose_thread_succeeded_should_work(self):
+        pipe = _manual_pipe_boilerplate(lambda out: out.write(b'data'), name='test')
+        pipe.read()
+        things = [(pipe, 'test')]
+
+        _cleanup(things, False)
+
     def test_cleanup_with_file_like_object_and_success_process_should_work(self):
         things = [
             (_mock_file_like_object(), 'test-1'),
@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+import tempfile
+
+from tests.classes import TestCaseWithoutLogs
+
+from mdbackup._commands.backup import _get_previous_backup
+
+
+class GetPreviousBackupTests(TestCaseWithoutLogs):
+    def setUp(self):
+        super().setUp()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.backups = Path(self._tmp.name)
+        self.current = self.backups / 'current'
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        super().tearDown()
+
+    def test_should_return_the_folder_pointed_by_current(self):
+        (self.backups / '2020-01-01T00:00').mkdir()
+        os.symlink(self.backups / '2020-01-01T00:00', self.current)
+
+        prev = _get_previous_backup(self.current)
+
+        self.assertEqual(self.backups / '2020-01-01T00:00', prev)
+
+    def test_should_return_none_if_current_does_not_exist(self):
+        prev = _get_previous_backup(self.current)
+
+        self.assertIsNone(prev)
+
+    def test_should_return_none_if_current_is_a_dangling_symlink(self):
+        os.symlink(self.backups / '2020-01-01T00:00', self.current)
+
+        prev = _get_previous_backup(self.current)
+
+        self.assertIsNone(prev)
+
+    def test_should_return_none_if_current_is_not_a_symlink(self):
+        self.current.mkdir()
+
+        prev = _get_previous_backup(self.current)
+
+        self.assertIsNone(prev)
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from mdbackup._commands.backup import _group_tasks_definitions
+
+
+def _names(groups):
+    return [[tasks.name for tasks in group] for group in groups]
+
+
+class GroupTasksDefinitionsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [
+            SimpleNamespace(name='a', inside_folder='db'),
+            SimpleNamespace(name='b', inside_folder='files'),
+            SimpleNamespace(name='c', inside_folder='./db/'),
+            SimpleNamespace(name='d', inside_folder='router'),
+        ]
+
+    def test_without_parallelism_should_return_all_definitions_in_one_group(self):
+        groups = _group_tasks_definitions(self.tasks, 1)
+
+        self.assertListEqual([self.tasks], groups)
+
+    def test_without_definitions_should_return_no_groups(self):
+        groups = _group_tasks_definitions([], 1)
+
+        self.assertListEqual([], groups)
+
+    def test_with_parallelism_should_group_definitions_by_inside_folder(self):
+        groups = _group_tasks_definitions(self.tasks, 4)
+
+        self.assertListEqual([['a', 'c'], ['b'], ['d']], _names(groups))
+
+    def test_with_parallelism_should_group_nested_inside_folders(self):
+        tasks = [
+            SimpleNamespace(name='a', inside_folder='db/mysql'),
+            SimpleNamespace(name='b', inside_folder='files'),
+            SimpleNamespace(name='c', inside_folder='db/postgres'),
+            SimpleNamespace(name='d', inside_folder='db'),
+            SimpleNamespace(name='e', inside_folder='dbs'),
+        ]
+
+        groups = _group_tasks_definitions(tasks, 4)
+
+        self.assertListEqual([['a', 'c', 'd'], ['b'], ['e']], _names(groups))
+
+    def test_with_parallelism_definitions_without_inside_folder_should_be_grouped_with_all(self):
+        tasks = self.tasks + [SimpleNamespace(name='e', inside_folder=None)]
+
+        groups = _group_tasks_definitions(tasks, 4)
+
+        self.assertListEqual([['a', 'b', 'c', 'd', 'e']], _names(groups))
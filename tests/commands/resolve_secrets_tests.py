@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from tests.classes import TestCaseWithoutLogs
+
+from mdbackup._commands.backup import _dicts_needing_resolution, _resolve_secrets, _secrets_cache
+
+
+class ResolveSecretsTests(TestCaseWithoutLogs):
+    def setUp(self):
+        super().setUp()
+        self.backend = Mock()
+        self.backend.get_secret.side_effect = lambda key: f'secret of {key}'
+        self.secret = SimpleNamespace(env={'db': {'password': 'db-pass'}}, backend=self.backend, type='mock')
+
+    def test_should_resolve_secret_aliases(self):
+        env = {'pass': '#db.password', 'user': 'root'}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertDictEqual({'pass': 'secret of db-pass', 'user': 'root'}, resolved)
+
+    def test_should_resolve_secret_aliases_in_nested_dicts(self):
+        env = {'database': {'pass': '#db.password'}}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertDictEqual({'database': {'pass': 'secret of db-pass'}}, resolved)
+        self.assertDictEqual({'database': {'pass': '#db.password'}}, env)
+
+    def test_should_keep_the_alias_if_it_cannot_be_resolved(self):
+        env = {'pass': '#db.user'}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertDictEqual({'pass': '#db.user'}, resolved)
+
+    def test_should_return_a_copy_when_there_is_nothing_to_resolve(self):
+        env = {'user': 'root', 'port': 3306, 'database': {'name': 'db'}}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertDictEqual(env, resolved)
+        self.assertIsNot(env, resolved)
+        self.assertIs(env['database'], resolved['database'])
+        self.backend.get_secret.assert_not_called()
+
+    def test_should_resolve_deeply_nested_aliases(self):
+        env = {'a': {'b': {'c': {'pass': '#db.password'}}, 'd': {'e': 'f'}}}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertDictEqual({'a': {'b': {'c': {'pass': 'secret of db-pass'}}, 'd': {'e': 'f'}}}, resolved)
+        self.assertIs(env['a']['d'], resolved['a']['d'])
+
+    def test_should_not_copy_nested_dicts_without_secrets(self):
+        env = {'pass': '#db.password', 'database': {'name': 'db'}}
+
+        resolved = _resolve_secrets(env, [self.secret])
+
+        self.assertEqual('secret of db-pass', resolved['pass'])
+        self.assertIs(env['database'], resolved['database'])
+
+    def test_should_request_the_secret_every_time_outside_a_backup(self):
+        env = {'pass': '#db.password'}
+
+        _resolve_secrets(env, [self.secret])
+        _resolve_secrets(env, [self.secret])
+
+        self.assertEqual(2, self.backend.get_secret.call_count)
+
+    def test_should_request_the_secret_once_inside_a_backup(self):
+        env = {'pass': '#db.password', 'other': {'pass': '#db.password'}}
+
+        token = _secrets_cache.set({})
+        try:
+            _resolve_secrets(env, [self.secret])
+            resolved = _resolve_secrets(env, [self.secret])
+        finally:
+            _secrets_cache.reset(token)
+
+        self.assertDictEqual({'pass': 'secret of db-pass', 'other': {'pass': 'secret of db-pass'}}, resolved)
+        self.backend.get_secret.assert_called_once_with('db-pass')
+
+
+class DictsNeedingResolutionTests(TestCaseWithoutLogs):
+    def test_should_return_the_dicts_containing_aliases_at_any_depth(self):
+        deepest = {'pass': '#db.password'}
+        middle = {'deepest': deepest, 'other': 1}
+        without_aliases = {'name': 'db', 'nested': {'port': 3306}}
+        env = {'middle': middle, 'without': without_aliases, 'user': 'root'}
+
+        needing_resolution = _dicts_needing_resolution(env)
+
+        self.assertSetEqual({id(env), id(middle), id(deepest)}, needing_resolution)
+
+    def test_should_return_nothing_if_there_are_no_aliases(self):
+        env = {'user': 'root', 'database': {'name': 'db'}}
+
+        needing_resolution = _dicts_needing_resolution(env)
+
+        self.assertSetEqual(set(), needing_resolution)
@@ -0,0 +1,81 @@
+from pathlib import Path
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from tests.classes import TestCaseWithoutLogs
+
+from mdbackup._commands.backup import _run_all_tasks_definitions
+
+
+def _tasks(name, inside_folder=None):
+    return SimpleNamespace(name=name, file_name=f'{name}.yaml', inside_folder=inside_folder)
+
+
+@patch('mdbackup._commands.backup._run_tasks_definition')
+class RunAllTasksDefinitionsTests(TestCaseWithoutLogs):
+    def _run(self, all_tasks, parallelism):
+        return _run_all_tasks_definitions(all_tasks, Path('/backup'), None, {}, [], parallelism)
+
+    def test_without_parallelism_should_run_all_definitions_in_order_in_the_current_thread(self, run_mock):
+        calls = []
+        run_mock.side_effect = lambda tasks, *_: calls.append((tasks.name, threading.current_thread())) or {}
+
+        results = self._run([_tasks('a'), _tasks('b', 'x'), _tasks('c')], 1)
+
+        self.assertListEqual(['a', 'b', 'c'], [name for name, _ in calls])
+        self.assertTrue(all(thread is threading.current_thread() for _, thread in calls))
+        self.assertDictEqual({'a.yaml': {}, 'b.yaml': {}, 'c.yaml': {}}, results)
+
+    def test_without_parallelism_should_stop_at_the_first_failure(self, run_mock):
+        calls = []
+
+        def run(tasks, *_):
+            calls.append(tasks.name)
+            if tasks.name == 'b':
+                raise KeyboardInterrupt()
+            return {}
+        run_mock.side_effect = run
+
+        with self.assertRaises(KeyboardInterrupt):
+            self._run([_tasks('a'), _tasks('b'), _tasks('c')], 1)
+
+        self.assertListEqual(['a', 'b'], calls)
+
+    def test_with_parallelism_should_run_definitions_of_different_folders_at_the_same_time(self, run_mock):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run(tasks, *_):
+            barrier.wait()
+            return {tasks.name: Path(tasks.name)}
+        run_mock.side_effect = run
+
+        results = self._run([_tasks('a', 'y'), _tasks('b', 'x')], 2)
+
+        self.assertDictEqual({'a.yaml': {'a': Path('a')}, 'b.yaml': {'b': Path('b')}}, results)
+
+    def test_with_parallelism_should_not_start_pending_definitions_after_a_failure(self, run_mock):
+        calls = []
+        running = threading.Event()
+        marked_as_failed = threading.Event()
+
+        class FailedEvent(threading.Event):
+            def set(self):
+                super().set()
+                marked_as_failed.set()
+
+        def run(tasks, *_):
+            calls.append(tasks.name)
+            if tasks.name == 'a':
+                running.wait(5)
+                raise Exception('a failed', 'a')
+            running.set()
+            marked_as_failed.wait(5)
+            return {}
+        run_mock.side_effect = run
+
+        with patch('mdbackup._commands.backup.Event', FailedEvent):
+            with self.assertRaisesRegex(Exception, 'a failed'):
+                self._run([_tasks('a', 'y'), _tasks('b', 'x'), _tasks('c', 'x')], 2)
+
+        self.assertListEqual(['a', 'b'], sorted(calls))
@@ -30,6 +30,7 @@ class ConfigTests(TestCase):
         ],
         'backupsPath': '/',
         'maxBackupsKept': -1,
+        'parallelism': 2,
         'logLevel': 'INFO',
         'env': {
             'a.d.2': 'ñ',
@@ -93,6 +94,8 @@ class ConfigTests(TestCase):
                     self.assertEqual(self._test_config.backups_path, config.backups_path)
                 with self.subTest(f'{key} - maxBackupsKept'):
                     self.assertEqual(self._test_config.max_backups_kept, config.max_backups_kept)
+                with self.subTest(f'{key} - parallelism'):
+                    self.assertEqual(self._test_config.parallelism, config.parallelism)
                 with self.subTest(f'{key} - logLevel'):
                     self.assertEqual(self._test_config.log_level, config.log_level)
                 with self.subTest(f'{key} - env'):
@@ -0,0 +1,43 @@
+from unittest.mock import Mock, patch
+
+from tests.classes import TestCaseWithoutLogs
+
+from mdbackup.storage.backblaze import B2Storage
+
+
+class B2StorageConfig(dict):
+    def __init__(self, backups_path: str, **kwargs):
+        super().__init__(keyId='id', appKey='key', bucket='bucket', **kwargs)
+        self.backups_path = backups_path
+
+
+class ListDirectoryTests(TestCaseWithoutLogs):
+    def setUp(self):
+        self.bucket = Mock()
+        b2_api = patch('mdbackup.storage.backblaze.B2Api').start()
+        b2_api.return_value.get_bucket_by_name.return_value = self.bucket
+        patch('mdbackup.storage.backblaze.InMemoryAccountInfo').start()
+        self.addCleanup(patch.stopall)
+
+    def test_list_directory_should_return_files_and_folders_without_the_prefix(self):
+        self.bucket.ls.return_value = [
+            (Mock(file_name='backups/2020-01-01T10:00/file.txt'), 'backups/2020-01-01T10:00/'),
+            (Mock(file_name='backups/file.txt'), None),
+        ]
+        storage = B2Storage(B2StorageConfig('backups'))
+
+        items = storage.list_directory('')
+
+        self.assertListEqual(items, ['2020-01-01T10:00/', 'file.txt'])
+        self.bucket.ls.assert_called_once_with('backups')
+
+    def test_list_directory_in_a_folder_should_keep_the_folder_in_the_items(self):
+        self.bucket.ls.return_value = [
+            (Mock(file_name='backups/2020-01-01T10:00/file.txt'), None),
+        ]
+        storage = B2Storage(B2StorageConfig('/backups/'))
+
+        items = storage.list_directory('2020-01-01T10:00')
+
+        self.assertListEqual(items, ['2020-01-01T10:00/file.txt'])
+        self.bucket.ls.assert_called_once_with('backups/2020-01-01T10:00')